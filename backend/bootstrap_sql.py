@@ -2,6 +2,18 @@ import os, asyncio, asyncpg
 
 DB_URL = os.getenv("DATABASE_URL")
 
+# every replica runs migrations on start (RUN_MIGRATIONS=1): serialize them
+MIGRATION_LOCK_SQL = "SELECT pg_advisory_xact_lock(hashtext('foody_migrations'));"
+
+async def _create_trigger(conn: asyncpg.Connection, name: str, table: str, ddl: str):
+    # create once instead of DROP+CREATE on every start (ACCESS EXCLUSIVE on the table);
+    # trigger functions are CREATE OR REPLACE, so their bodies still update
+    exists = await conn.fetchval(
+        "SELECT 1 FROM pg_trigger WHERE tgname = $1 AND tgrelid = $2::regclass", name, table,
+    )
+    if not exists:
+        await conn.execute(ddl)
+
 async def _ensure(conn: asyncpg.Connection):
     # --- foody_restaurants ---
     await conn.execute("""
@@ -150,7 +162,9 @@ async def _ensure(conn: asyncpg.Connection):
 async def run():
     conn = await asyncpg.connect(DB_URL)
     try:
-        await _ensure(conn)
+        async with conn.transaction():
+            await conn.execute(MIGRATION_LOCK_SQL)
+            await _ensure(conn)
     finally:
         await conn.close()
 
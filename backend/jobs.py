@@ -0,0 +1,385 @@
+import os, json, random, asyncio, socket
+from typing import Dict, Any, Optional, Callable, Awaitable, List
+
+import asyncpg
+
+import bootstrap_sql
+
+# jobs — durable background queue on Postgres.
+#   enqueue()  : INSERT into `jobs` (trigger sends NOTIFY foody_jobs, payload = queue)
+#   Worker     : LISTEN (reconnected if dropped) + batched dequeue with FOR UPDATE SKIP LOCKED,
+#                global per-queue concurrency, retries with exponential backoff,
+#                jobs that run out of attempts are moved to `jobs_dead`.
+# Run the worker with `python worker.py` next to `uvicorn main:app`.
+
+NOTIFY_CHANNEL = "foody_jobs"
+
+JOB_BATCH = int(os.getenv("JOB_BATCH", "10"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "5"))
+# running jobs renew locked_at every lease/3; a lease older than this means the worker is gone
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_BACKOFF_BASE = float(os.getenv("JOB_BACKOFF_BASE", "2"))
+JOB_BACKOFF_MAX = float(os.getenv("JOB_BACKOFF_MAX", "3600"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+# "queue:concurrency,..." — limits are global across all worker processes
+# (running rows are counted under a per-queue advisory lock at dequeue);
+# give every worker of a queue the same limit
+JOB_QUEUES = os.getenv("JOB_QUEUES", "default:4")
+
+async def _ensure(conn: asyncpg.Connection):
+    async with conn.transaction():
+        await conn.execute(bootstrap_sql.MIGRATION_LOCK_SQL)
+        await _create(conn)
+
+async def _create(conn: asyncpg.Connection):
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id           BIGSERIAL PRIMARY KEY,
+            queue        TEXT NOT NULL DEFAULT 'default',
+            kind         TEXT NOT NULL,
+            payload      JSONB NOT NULL DEFAULT '{}'::jsonb,
+            status       TEXT NOT NULL DEFAULT 'queued',   -- queued | running
+            attempts     INT NOT NULL DEFAULT 0,
+            max_attempts INT NOT NULL DEFAULT 5,
+            run_at       TIMESTAMPTZ NOT NULL DEFAULT now(),
+            locked_at    TIMESTAMPTZ,
+            locked_by    TEXT,
+            last_error   TEXT,
+            created_at   TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+
+        CREATE TABLE IF NOT EXISTS jobs_dead (
+            id           BIGINT PRIMARY KEY,
+            queue        TEXT NOT NULL,
+            kind         TEXT NOT NULL,
+            payload      JSONB NOT NULL,
+            attempts     INT NOT NULL,
+            last_error   TEXT,
+            created_at   TIMESTAMPTZ NOT NULL,
+            failed_at    TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+
+        CREATE INDEX IF NOT EXISTS jobs_ready_idx ON jobs(queue, run_at, id) WHERE status = 'queued';
+        CREATE INDEX IF NOT EXISTS jobs_running_idx ON jobs(locked_at) WHERE status = 'running';
+        CREATE INDEX IF NOT EXISTS jobs_running_queue_idx ON jobs(queue) WHERE status = 'running';
+    """)
+    await conn.execute(r"""
+        CREATE OR REPLACE FUNCTION jobs_notify() RETURNS trigger AS $$
+        BEGIN
+          PERFORM pg_notify('foody_jobs', NEW.queue);
+          RETURN NEW;
+        END $$ LANGUAGE plpgsql;
+    """)
+    await bootstrap_sql._create_trigger(conn, "jobs_notify_trg", "jobs", """
+        CREATE TRIGGER jobs_notify_trg
+        AFTER INSERT ON jobs
+        FOR EACH ROW EXECUTE FUNCTION jobs_notify();
+    """)
+
+async def enqueue(
+    conn,
+    kind: str,
+    payload: Optional[Dict[str, Any]] = None,
+    queue: str = "default",
+    delay_seconds: float = 0,
+    max_attempts: int = JOB_MAX_ATTEMPTS,
+) -> int:
+    """conn: asyncpg connection or pool; inside a transaction the job commits with it."""
+    return await conn.fetchval(
+        """
+        INSERT INTO jobs (queue, kind, payload, max_attempts, run_at)
+        VALUES ($1, $2, $3::jsonb, $4, now() + make_interval(secs => $5))
+        RETURNING id
+        """,
+        queue, kind, json.dumps(payload or {}), max_attempts, float(delay_seconds),
+    )
+
+# ====== Handlers ======
+Handler = Callable[[Dict[str, Any]], Awaitable[Any]]
+HANDLERS: Dict[str, Handler] = {}
+
+def handler(kind: str):
+    def wrap(fn: Handler) -> Handler:
+        HANDLERS[kind] = fn
+        return fn
+    return wrap
+
+@handler("noop")
+async def _noop(payload: Dict[str, Any]):
+    return None
+
+def _backoff(attempts: int) -> float:
+    delay = min(JOB_BACKOFF_BASE ** attempts, JOB_BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+def parse_queues(spec: str) -> Dict[str, int]:
+    out: Dict[str, int] = {}
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, limit = part.partition(":")
+        out[name.strip()] = max(1, int(limit or 1))
+    return out
+
+# ====== Worker ======
+class Worker:
+    def __init__(
+        self,
+        dsn: str,
+        queues: Dict[str, int],
+        batch: int = JOB_BATCH,
+        name: Optional[str] = None,
+        on_ready: Optional[Callable[[], None]] = None,
+    ):
+        self.dsn = dsn
+        self.on_ready = on_ready
+        self.queues = queues
+        self.batch = batch
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self._pool: asyncpg.pool.Pool | None = None
+        self._listen: asyncpg.Connection | None = None
+        self._relisten_task: asyncio.Task | None = None
+        self._wakeup: Dict[str, asyncio.Event] = {q: asyncio.Event() for q in queues}
+        self._stopping = asyncio.Event()
+        self._inflight: set[asyncio.Task] = set()
+        # queues whose global limit was reached at our last dequeue: finishing a
+        # job there NOTIFYs so workers waiting on the limit don't sit out the poll
+        self._capped: set[str] = set()
+
+    def _on_notify(self, conn, pid, channel, queue):
+        ev = self._wakeup.get(queue)
+        if ev:
+            ev.set()
+
+    async def _connect_listen(self):
+        conn = await asyncpg.connect(self.dsn)
+        await conn.add_listener(NOTIFY_CHANNEL, self._on_notify)
+        conn.add_termination_listener(self._on_listen_lost)
+        self._listen = conn
+
+    def _on_listen_lost(self, conn):
+        # also fires on our own close(), which first drops self._listen
+        if conn is not self._listen or self._stopping.is_set():
+            return
+        print("JOB_LISTEN_LOST: reconnecting; queues fall back to polling meanwhile")
+        self._listen = None
+        if self._relisten_task is None or self._relisten_task.done():
+            self._relisten_task = asyncio.create_task(self._relisten())
+
+    async def _relisten(self):
+        delay = 1.0
+        while not self._stopping.is_set():
+            try:
+                await self._connect_listen()
+            except Exception as e:
+                print("JOB_LISTEN_ERROR:", repr(e))
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                delay = min(delay * 2, 30.0)
+                continue
+            print("JOB_LISTEN_RESTORED")
+            # NOTIFYs sent while disconnected are gone: every queue re-checks now
+            for ev in self._wakeup.values():
+                ev.set()
+            return
+
+    def stop(self):
+        self._stopping.set()
+        for ev in self._wakeup.values():
+            ev.set()
+
+    async def _dequeue(self, queue: str, limit: int) -> List[asyncpg.Record]:
+        async with self._pool.acquire() as conn, conn.transaction():
+            # one dequeuer per queue at a time, so count + claim can't over-admit
+            await conn.execute("SELECT pg_advisory_xact_lock(hashtext('foody_jobs:' || $1))", queue)
+            running = await conn.fetchval(
+                "SELECT count(*) FROM jobs WHERE queue = $1 AND status = 'running'", queue,
+            )
+            limit = min(limit, self.queues[queue] - running)
+            if limit <= 0:
+                self._capped.add(queue)
+                return []
+            rows = await conn.fetch(
+                """
+                UPDATE jobs j
+                   SET status = 'running', locked_at = now(), locked_by = $3, attempts = j.attempts + 1
+                 WHERE j.id IN (
+                       SELECT id FROM jobs
+                        WHERE queue = $1 AND status = 'queued' AND run_at <= now()
+                        ORDER BY run_at, id
+                        LIMIT $2
+                        FOR UPDATE SKIP LOCKED
+                 )
+                RETURNING j.id, j.queue, j.kind, j.payload, j.attempts, j.max_attempts
+                """,
+                queue, limit, self.name,
+            )
+            if len(rows) == limit and running + limit >= self.queues[queue]:
+                self._capped.add(queue)
+            else:
+                self._capped.discard(queue)
+            return rows
+
+    # every write to a dequeued job is conditional on still owning its lease:
+    # same worker and same attempt, so a job reclaimed by the reaper is left alone
+    _OWNED = "id = $1 AND status = 'running' AND locked_by = $2 AND attempts = $3"
+
+    async def _heartbeat(self, job: asyncpg.Record):
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            try:
+                async with self._pool.acquire() as conn:
+                    res = await conn.execute(
+                        f"UPDATE jobs SET locked_at = now() WHERE {self._OWNED}",
+                        job["id"], self.name, job["attempts"],
+                    )
+                if res == "UPDATE 0":
+                    print("JOB_LEASE_LOST:", job["id"], job["kind"])
+                    return
+            except Exception as e:
+                print("JOB_HEARTBEAT_ERROR:", job["id"], repr(e))
+
+    async def _finish(self, job: asyncpg.Record, error: Optional[str]):
+        args = (job["id"], self.name, job["attempts"])
+        async with self._pool.acquire() as conn:
+            if error is None:
+                res = await conn.execute(f"DELETE FROM jobs WHERE {self._OWNED}", *args)
+            elif job["attempts"] >= job["max_attempts"]:
+                res = await conn.execute(
+                    f"""
+                    WITH moved AS (DELETE FROM jobs WHERE {self._OWNED} RETURNING *)
+                    INSERT INTO jobs_dead (id, queue, kind, payload, attempts, last_error, created_at)
+                    SELECT id, queue, kind, payload, attempts, $4, created_at FROM moved
+                    ON CONFLICT (id) DO NOTHING
+                    """,
+                    *args, error,
+                )
+                print("JOB_DEAD:", job["id"], job["kind"], error)
+            else:
+                res = await conn.execute(
+                    f"""
+                    UPDATE jobs
+                       SET status = 'queued', locked_at = NULL, locked_by = NULL, last_error = $4,
+                           run_at = now() + make_interval(secs => $5)
+                     WHERE {self._OWNED}
+                    """,
+                    *args, error, _backoff(job["attempts"]),
+                )
+            if job["queue"] in self._capped:
+                await conn.execute("SELECT pg_notify($1, $2)", NOTIFY_CHANNEL, job["queue"])
+        if res.endswith(" 0"):
+            print("JOB_LEASE_LOST:", job["id"], job["kind"], "result discarded")
+
+    async def _run(self, job: asyncpg.Record, sem: asyncio.Semaphore):
+        error = None
+        beat = asyncio.create_task(self._heartbeat(job))
+        try:
+            fn = HANDLERS.get(job["kind"])
+            if fn is None:
+                raise RuntimeError(f"no handler for job kind {job['kind']!r}")
+            payload = job["payload"]
+            await fn(json.loads(payload) if isinstance(payload, str) else payload)
+        except Exception as e:
+            error = repr(e)
+            print("JOB_ERROR:", job["id"], job["kind"], error)
+        finally:
+            beat.cancel()
+            try:
+                await self._finish(job, error)
+            except Exception as e:
+                # lease expiry will requeue the job
+                print("JOB_FINISH_ERROR:", job["id"], repr(e))
+            sem.release()
+
+    async def _queue_loop(self, queue: str, limit: int):
+        sem = asyncio.Semaphore(limit)
+        wakeup = self._wakeup[queue]
+        while True:
+            await sem.acquire()
+            if self._stopping.is_set():
+                sem.release()
+                break
+            # grab one slot, then as many more as are free right now
+            free = 1
+            while free < min(limit, self.batch) and not sem.locked():
+                await sem.acquire()
+                free += 1
+            wakeup.clear()
+            try:
+                jobs = await self._dequeue(queue, free)
+            except Exception as e:
+                print("JOB_DEQUEUE_ERROR:", queue, repr(e))
+                jobs = []
+            for _ in range(free - len(jobs)):
+                sem.release()
+            for job in jobs:
+                t = asyncio.create_task(self._run(job, sem))
+                self._inflight.add(t)
+                t.add_done_callback(self._inflight.discard)
+            if len(jobs) < free:
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _reaper(self):
+        # jobs whose lease expired (worker died or hung): a lost worker counts as a
+        # failed attempt — dead-letter when exhausted, otherwise requeue with backoff
+        while not self._stopping.is_set():
+            try:
+                async with self._pool.acquire() as conn, conn.transaction():
+                    await conn.execute(
+                        """
+                        WITH moved AS (
+                            DELETE FROM jobs
+                             WHERE status = 'running' AND locked_at < now() - make_interval(secs => $1)
+                               AND attempts >= max_attempts
+                            RETURNING *
+                        )
+                        INSERT INTO jobs_dead (id, queue, kind, payload, attempts, last_error, created_at)
+                        SELECT id, queue, kind, payload, attempts, 'lease expired', created_at FROM moved
+                        ON CONFLICT (id) DO NOTHING
+                        """,
+                        float(JOB_LEASE_SECONDS),
+                    )
+                    await conn.execute(
+                        """
+                        UPDATE jobs
+                           SET status = 'queued', locked_at = NULL, locked_by = NULL,
+                               last_error = 'lease expired',
+                               run_at = now() + make_interval(secs => LEAST(power($2::float8, attempts), $3::float8))
+                         WHERE status = 'running' AND locked_at < now() - make_interval(secs => $1)
+                        """,
+                        float(JOB_LEASE_SECONDS), JOB_BACKOFF_BASE, JOB_BACKOFF_MAX,
+                    )
+            except Exception as e:
+                print("JOB_REAPER_ERROR:", repr(e))
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=JOB_LEASE_SECONDS / 2)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self):
+        size = sum(self.queues.values()) + 2
+        self._pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=size)
+        await self._connect_listen()
+        try:
+            loops = [asyncio.create_task(self._queue_loop(q, n)) for q, n in self.queues.items()]
+            loops.append(asyncio.create_task(self._reaper()))
+            # pool open and LISTEN registered: notifications from here on are seen
+            if self.on_ready:
+                self.on_ready()
+            await self._stopping.wait()
+            await asyncio.gather(*loops, return_exceptions=True)
+            if self._inflight:
+                await asyncio.gather(*self._inflight, return_exceptions=True)
+        finally:
+            if self._relisten_task is not None:
+                self._relisten_task.cancel()
+            listen, self._listen = self._listen, None
+            if listen is not None:
+                await listen.close()
+            await self._pool.close()
@@ -0,0 +1,233 @@
+"""
+Failure-path check for the job queue: runs two in-process workers against a real
+Postgres and asserts what ends up in `jobs` / `jobs_dead`.
+
+    DATABASE_URL=... python jobs_check.py
+
+  - retry + dead-letter : a handler that always raises is retried with backoff,
+                          then moved to jobs_dead with attempts = max_attempts
+  - heartbeat           : a handler running 3x past the lease keeps it, runs once
+  - global cap          : a queue limited to 1 (on both workers) never has more than
+                          one running row / handler at a time
+  - reaper              : expired leases of a vanished worker are dead-lettered when
+                          out of attempts, requeued (and then completed) otherwise
+  - lease-owner guard   : _finish() from another worker or a stale attempt leaves the
+                          row untouched
+
+Uses a 2s lease, and the workers' reaper covers every queue: point it at a dev
+database, not one with live workers. Only check_* queues are written/cleaned up.
+Exits non-zero on the first failed assertion. Expects migrations to have run.
+"""
+import os, sys, time, asyncio
+from typing import Dict, List
+
+import asyncpg
+
+# short lease/backoff/poll so every path fires within seconds; read by jobs at import
+os.environ.update({
+    "JOB_LEASE_SECONDS": "2",
+    "JOB_BACKOFF_BASE": "1",
+    "JOB_BACKOFF_MAX": "1",
+    "JOB_POLL_SECONDS": "0.2",
+})
+import jobs  # noqa: E402
+
+DB_URL = os.getenv("DATABASE_URL")
+QUEUES = {"check_fail": 2, "check_slow": 1, "check_cap": 1, "check_reap": 2}
+GUARD_QUEUE = "check_guard"  # not served by the workers: rows there are only touched by _finish()
+ALL_QUEUES = list(QUEUES) + [GUARD_QUEUE]
+
+
+class CheckError(AssertionError):
+    pass
+
+
+# ====== Handlers (record when each tagged job ran) ======
+_calls: Dict[str, List[float]] = {}
+_cap = {"now": 0, "max": 0}
+
+def _record(payload):
+    _calls.setdefault(payload["tag"], []).append(time.monotonic())
+
+@jobs.handler("check_fail")
+async def _fail(payload):
+    _record(payload)
+    raise RuntimeError("check_fail boom")
+
+@jobs.handler("check_sleep")
+async def _sleep(payload):
+    _record(payload)
+    await asyncio.sleep(payload.get("seconds", 0))
+
+@jobs.handler("check_cap")
+async def _capped(payload):
+    _record(payload)
+    _cap["now"] += 1
+    _cap["max"] = max(_cap["max"], _cap["now"])
+    try:
+        await asyncio.sleep(payload["seconds"])
+    finally:
+        _cap["now"] -= 1
+
+
+async def _wait_for(pred, what: str, timeout: float = 20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if await pred():
+            return
+        await asyncio.sleep(0.1)
+    raise CheckError(f"timed out after {timeout:.0f}s waiting for {what}")
+
+async def _dead(pool, job_id: int):
+    return await pool.fetchrow("SELECT attempts, last_error FROM jobs_dead WHERE id=$1", job_id)
+
+async def _gone(pool, job_id: int) -> bool:
+    return await pool.fetchval("SELECT NOT EXISTS (SELECT 1 FROM jobs WHERE id=$1)", job_id)
+
+
+# ====== Checks ======
+async def check_retry_dead_letter(pool):
+    job_id = await jobs.enqueue(pool, "check_fail", {"tag": "fail"}, queue="check_fail", max_attempts=3)
+
+    async def dead():
+        return await _dead(pool, job_id) is not None
+    await _wait_for(dead, "failing job in jobs_dead")
+
+    row = await _dead(pool, job_id)
+    calls = _calls.get("fail", [])
+    if row["attempts"] != 3 or "boom" not in (row["last_error"] or "") or len(calls) != 3:
+        raise CheckError(f"retry/dead-letter: jobs_dead={dict(row)}, handler calls={len(calls)}, want 3")
+    if not await _gone(pool, job_id):
+        raise CheckError("retry/dead-letter: job still in jobs after dead-lettering")
+    for attempt, (a, b) in enumerate(zip(calls, calls[1:]), start=1):
+        # _backoff() jitters by +-20%; allow 0.1s for clock/poll granularity
+        floor = 0.8 * min(jobs.JOB_BACKOFF_BASE ** attempt, jobs.JOB_BACKOFF_MAX) - 0.1
+        if b - a < floor:
+            raise CheckError(f"retry/dead-letter: attempt {attempt + 1} ran {b - a:.2f}s after the previous, want >= {floor:.2f}s")
+    print(f"ok retry/dead-letter: 3 attempts, gaps {[round(b - a, 2) for a, b in zip(calls, calls[1:])]}s, in jobs_dead")
+
+async def check_heartbeat(pool):
+    seconds = 3 * jobs.JOB_LEASE_SECONDS
+    # max_attempts=1: if the reaper took the lease the job would go straight to jobs_dead
+    job_id = await jobs.enqueue(
+        pool, "check_sleep", {"tag": "slow", "seconds": seconds}, queue="check_slow", max_attempts=1,
+    )
+    oldest = 0.0
+    while not await _gone(pool, job_id):
+        age = await pool.fetchval(
+            "SELECT extract(epoch FROM now() - locked_at) FROM jobs WHERE id=$1 AND status='running'", job_id,
+        )
+        oldest = max(oldest, float(age or 0))
+        if oldest >= jobs.JOB_LEASE_SECONDS:
+            raise CheckError(f"heartbeat: lease is {oldest:.1f}s old, not renewed")
+        await asyncio.sleep(0.1)
+    if await _dead(pool, job_id) is not None or len(_calls.get("slow", [])) != 1:
+        raise CheckError(f"heartbeat: slow job reaped (calls={len(_calls.get('slow', []))})")
+    print(f"ok heartbeat: {seconds}s job on a {jobs.JOB_LEASE_SECONDS}s lease ran once, oldest lease {oldest:.1f}s")
+
+async def check_global_cap(pool):
+    n = 6
+    ids = [
+        await jobs.enqueue(pool, "check_cap", {"tag": "cap", "seconds": 0.3}, queue="check_cap")
+        for _ in range(n)
+    ]
+    most = 0
+    while await pool.fetchval("SELECT count(*) FROM jobs WHERE id = ANY($1::bigint[])", ids):
+        running = await pool.fetchval("SELECT count(*) FROM jobs WHERE queue='check_cap' AND status='running'")
+        most = max(most, running)
+        if most > 1 or _cap["max"] > 1:
+            raise CheckError(f"global cap: {most} running rows / {_cap['max']} handlers at once, limit 1")
+        await asyncio.sleep(0.05)
+    if len(_calls.get("cap", [])) != n:
+        raise CheckError(f"global cap: {len(_calls.get('cap', []))} of {n} jobs ran")
+    print(f"ok global cap: {n} jobs across 2 workers, at most {max(most, _cap['max'])} running")
+
+async def check_reaper(pool):
+    # rows as a crashed worker leaves them: running, lease long expired
+    insert = """
+        INSERT INTO jobs (queue, kind, payload, status, attempts, max_attempts, locked_at, locked_by)
+        VALUES ('check_reap', 'check_sleep', $1::jsonb, 'running', $2, $3, now() - interval '1 hour', 'check-ghost')
+        RETURNING id
+    """
+    exhausted = await pool.fetchval(insert, '{"tag": "reap_dead"}', 2, 2)
+    retried = await pool.fetchval(insert, '{"tag": "reap_retry"}', 1, 3)
+
+    async def done():
+        return await _dead(pool, exhausted) is not None and await _gone(pool, retried)
+    await _wait_for(done, "reaper to dead-letter / requeue expired leases")
+
+    row = await _dead(pool, exhausted)
+    if row["last_error"] != "lease expired" or row["attempts"] != 2 or "reap_dead" in _calls:
+        raise CheckError(f"reaper: exhausted job jobs_dead={dict(row)}, ran={'reap_dead' in _calls}")
+    if await _dead(pool, retried) is not None or len(_calls.get("reap_retry", [])) != 1:
+        raise CheckError(f"reaper: requeued job calls={len(_calls.get('reap_retry', []))}, want 1 and not dead")
+    print("ok reaper: exhausted lease dead-lettered, the other requeued and completed")
+
+async def check_lease_guard(pool, owner: jobs.Worker, other: jobs.Worker):
+    job_id = await pool.fetchval(
+        """
+        INSERT INTO jobs (queue, kind, status, attempts, max_attempts, locked_at, locked_by)
+        VALUES ($1, 'check_sleep', 'running', 2, 2, now(), $2)
+        RETURNING id
+        """,
+        GUARD_QUEUE, owner.name,
+    )
+    job = {"id": job_id, "queue": GUARD_QUEUE, "kind": "check_sleep", "attempts": 2, "max_attempts": 2}
+    before = dict(await pool.fetchrow("SELECT * FROM jobs WHERE id=$1", job_id))
+
+    for label, worker, attempts, error in [
+        ("stale attempt, success", owner, 1, None),
+        ("other worker, success", other, 2, None),
+        ("other worker, final failure", other, 2, "check guard"),
+    ]:
+        await worker._finish(dict(job, attempts=attempts), error)
+        after = await pool.fetchrow("SELECT * FROM jobs WHERE id=$1", job_id)
+        if after is None or dict(after) != before or await _dead(pool, job_id) is not None:
+            raise CheckError(f"lease guard: {label} changed the job: {after and dict(after)}")
+
+    await owner._finish(job, None)
+    if not await _gone(pool, job_id):
+        raise CheckError("lease guard: the owning worker could not finish its own job")
+    print("ok lease guard: foreign/stale _finish() ignored, owner's applied")
+
+
+async def _cleanup(pool):
+    await pool.execute("DELETE FROM jobs WHERE queue = ANY($1::text[])", ALL_QUEUES)
+    await pool.execute("DELETE FROM jobs_dead WHERE queue = ANY($1::text[])", ALL_QUEUES)
+
+async def run():
+    pool = await asyncpg.create_pool(DB_URL, min_size=1, max_size=6)
+    try:
+        await _cleanup(pool)
+        ready = [asyncio.Event(), asyncio.Event()]
+        workers = [
+            jobs.Worker(DB_URL, QUEUES, name=f"check-{i}", on_ready=ev.set)
+            for i, ev in enumerate(ready)
+        ]
+        tasks = [asyncio.create_task(w.run()) for w in workers]
+        try:
+            await asyncio.wait_for(asyncio.gather(*(ev.wait() for ev in ready)), timeout=30)
+            await check_lease_guard(pool, *workers)
+            await asyncio.gather(
+                check_retry_dead_letter(pool),
+                check_heartbeat(pool),
+                check_global_cap(pool),
+                check_reaper(pool),
+            )
+        finally:
+            for w in workers:
+                w.stop()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await _cleanup(pool)
+    finally:
+        await pool.close()
+
+
+if __name__ == "__main__":
+    if not DB_URL:
+        sys.exit("DATABASE_URL missing")
+    try:
+        asyncio.run(run())
+    except CheckError as e:
+        print("JOBS_CHECK_FAILED:", e)
+        sys.exit(1)
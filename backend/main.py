@@ -11,14 +11,19 @@ from fastapi.responses import JSONResponse
 
 import bcrypt
 import jwt  # PyJWT
-import boto3
-from botocore.config import Config as BotoConfig
-from botocore.exceptions import BotoCoreError, ClientError
+# boto3/botocore импортируются лениво в _r2_client(): большинству воркеров upload не нужен
+
+import bootstrap_sql
+import offer_feed
+import jobs
 
 # ====== ENV ======
 DATABASE_URL = os.environ.get("DATABASE_URL")
 CORS_ORIGINS = os.environ.get("CORS_ORIGINS", "")
 RUN_MIGRATIONS = os.environ.get("RUN_MIGRATIONS", "0") == "1"
+# пул открывается сразу на DB_POOL_MIN соединений (прогрев до readiness)
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", "5"))
+DB_POOL_MAX = max(DB_POOL_MIN, int(os.environ.get("DB_POOL_MAX", "10")))
 
 R2_ENDPOINT = os.environ.get("R2_ENDPOINT")  # https://<account>.r2.cloudflarestorage.com
 R2_BUCKET = os.environ.get("R2_BUCKET")
@@ -36,6 +41,7 @@ NO_PHOTO_URL = "https://foodyweb-production.up.railway.app/img/no-photo.png"
 # ====== APP / CORS ======
 app = FastAPI()
 _pool: asyncpg.pool.Pool | None = None
+_r2 = None
 
 origins = [o.strip() for o in CORS_ORIGINS.split(",") if o.strip()]
 app.add_middleware(
@@ -66,6 +72,9 @@ def _decode_jwt(token: str) -> Optional[dict]:
     except Exception:
         return None
 
+_USER_BY_ID_SQL = "SELECT id, phone, name FROM users WHERE id=$1"
+_FOODY_KEY_SQL = "SELECT 1 FROM foody_restaurants WHERE restaurant_id=$1 AND api_key=$2"
+
 async def get_current_user(request: Request):
     token = request.cookies.get(SESSION_COOKIE)
     if not token:
@@ -75,7 +84,7 @@ async def get_current_user(request: Request):
         raise HTTPException(status_code=401, detail="Invalid token")
     user_id = int(data["sub"])
     async with _pool.acquire() as conn:
-        user = await conn.fetchrow("SELECT id, phone, name FROM users WHERE id=$1", user_id)
+        user = await conn.fetchrow(_USER_BY_ID_SQL, user_id)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     return dict(user)
@@ -165,26 +174,84 @@ async def _initialize(conn: asyncpg.Connection):
 
 async def _ensure(conn: asyncpg.Connection):
     if RUN_MIGRATIONS:
-        await _initialize(conn)
+        # одна транзакция под advisory lock: реплики стартуют параллельно
+        async with conn.transaction():
+            await conn.execute(bootstrap_sql.MIGRATION_LOCK_SQL)
+            await _initialize(conn)
+            # foody_* (/api/v1) и offer_feed поверх обеих схем
+            await bootstrap_sql._ensure(conn)
+            await offer_feed._ensure(conn)
+            await jobs._ensure(conn)
+
+# горячие запросы: на каждом соединении пула выполняем ровно тот же текст, что
+# и роуты, с параметрами, не дающими строк (LIMIT 0 / несуществующий ключ).
+# Так запрос попадает в кэш statement'ов asyncpg (conn.prepare() его не наполняет)
+# вместе с разбором на сервере и интроспекцией типов
+_HOT_STATEMENTS = [
+    (_USER_BY_ID_SQL, (0,)),
+    (offer_feed.PUBLIC_OFFERS_SQL, (0,)),
+    (offer_feed.V1_OFFERS_SQL, (0,)),
+    (offer_feed.V1_MERCHANT_OFFERS_SQL, ("",)),
+    (_FOODY_KEY_SQL, ("", "")),
+]
+
+async def _warm_conn(conn: asyncpg.Connection):
+    # ошибки не глушим: create_pool упадёт, и вместе с ним старт приложения
+    for sql, args in _HOT_STATEMENTS:
+        await conn.fetch(sql, *args)
 
 @app.on_event("startup")
 async def pool():
     global _pool
     if not DATABASE_URL:
         raise RuntimeError("DATABASE_URL missing")
-    _pool = await asyncpg.create_pool(DATABASE_URL, min_size=1, max_size=5)
-    async with _pool.acquire() as conn:
+    # миграции до пула: прогрев ссылается на таблицы, которые они создают
+    conn = await asyncpg.connect(DATABASE_URL)
+    try:
         await _ensure(conn)
+    finally:
+        await conn.close()
+    # ошибка прогрева пробрасывается: приложение не стартует, а не отдаёт 500
+    # на каждом запросе с _pool = None
+    # max_inactive_connection_lifetime=0: прогретые соединения не закрываются
+    # по простою, и init не повторяется посреди запроса после паузы
+    _pool = await asyncpg.create_pool(
+        DATABASE_URL, min_size=DB_POOL_MIN, max_size=DB_POOL_MAX,
+        init=_warm_conn, max_inactive_connection_lifetime=0,
+    )
+
+@app.on_event("shutdown")
+async def close_pool():
+    if _pool is not None:
+        await _pool.close()
 
+# liveness: процесс жив; readiness: пул прогрет и БД отвечает
 @app.get("/health")
+@app.get("/health/live")
 async def health():
     return {"ok": True}
 
+@app.get("/health/ready")
+async def ready():
+    if _pool is None:
+        return JSONResponse({"ok": False, "detail": "pool not ready"}, status_code=503)
+    try:
+        async with _pool.acquire(timeout=2) as conn:
+            await conn.fetchval("SELECT 1")
+    except Exception as e:
+        return JSONResponse({"ok": False, "detail": repr(e)}, status_code=503)
+    return {"ok": True, "pool_size": _pool.get_size(), "pool_idle": _pool.get_idle_size()}
+
 # ====== R2 client / URL helpers (upload) ======
 def _r2_client():
+    global _r2
+    if _r2 is not None:
+        return _r2
     if not all([R2_ENDPOINT, R2_BUCKET, R2_ACCESS_KEY_ID, R2_SECRET_ACCESS_KEY]):
         raise RuntimeError("R2 env not configured")
-    return boto3.client(
+    import boto3
+    from botocore.config import Config as BotoConfig
+    _r2 = boto3.client(
         "s3",
         endpoint_url=R2_ENDPOINT,
         aws_access_key_id=R2_ACCESS_KEY_ID,
@@ -192,6 +259,7 @@ def _r2_client():
         config=BotoConfig(signature_version="s3v4"),
         region_name="auto",
     )
+    return _r2
 
 def _pub_url_or_none(key: str) -> Optional[str]:
     try:
@@ -203,6 +271,7 @@ def _pub_url_or_none(key: str) -> Optional[str]:
 
 @app.post("/upload")
 async def upload(file: UploadFile = File(...)):
+    from botocore.exceptions import BotoCoreError, ClientError
     try:
         ext = os.path.splitext(file.filename or "")[1].lower() or ".jpg"
         if ext not in [".jpg", ".jpeg", ".png", ".webp"]:
@@ -437,18 +506,28 @@ async def create_offer(payload: Dict[str, Any] = Body(...), user = Depends(get_c
 @app.get("/public/offers")
 async def public_offers():
     async with _pool.acquire() as conn:
-        rows = await conn.fetch(
-            """
-            SELECT o.id, o.title, o.description, o.price, o.stock, o.category,
-                   o.image_url, o.expires_at, o.status,
-                   l.id AS location_id, l.name AS merchant_name, l.address_line AS address, l.city
-            FROM offers o
-            JOIN locations l ON l.id = o.location_id
-            WHERE o.status = 'active'
-              AND o.expires_at > NOW()
-              AND o.stock > 0
-            ORDER BY o.expires_at ASC
-            LIMIT 200
-            """
-        )
+        rows = await conn.fetch(offer_feed.PUBLIC_OFFERS_SQL, offer_feed.FEED_LIMIT)
+        return [dict(r) for r in rows]
+
+# ====== /api/v1 (offer_feed: офферы обеих схем) ======
+async def _check_foody_key(conn: asyncpg.Connection, restaurant_id: str, api_key: Optional[str]):
+    if not restaurant_id:
+        raise HTTPException(status_code=400, detail="restaurant_id is required")
+    if not api_key:
+        raise HTTPException(status_code=401, detail="X-Foody-Key is required")
+    ok = await conn.fetchval(_FOODY_KEY_SQL, restaurant_id, api_key)
+    if not ok:
+        raise HTTPException(status_code=403, detail="Invalid restaurant_id or key")
+
+@app.get("/api/v1/offers")
+async def v1_offers():
+    async with _pool.acquire() as conn:
+        rows = await conn.fetch(offer_feed.V1_OFFERS_SQL, offer_feed.FEED_LIMIT)
+        return [dict(r) for r in rows]
+
+@app.get("/api/v1/merchant/offers")
+async def v1_merchant_offers(restaurant_id: str, request: Request):
+    async with _pool.acquire() as conn:
+        await _check_foody_key(conn, restaurant_id, request.headers.get("X-Foody-Key"))
+        rows = await conn.fetch(offer_feed.V1_MERCHANT_OFFERS_SQL, restaurant_id)
         return [dict(r) for r in rows]
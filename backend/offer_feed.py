@@ -0,0 +1,313 @@
+import asyncpg
+
+import bootstrap_sql
+
+# offer_feed — denormalized read model merging both offer schemas:
+#   source='offers' : offers ⋈ locations               (main.py, POST /merchant/offers)
+#   source='foody'  : foody_offers ⋈ foody_restaurants (bootstrap_sql.py, /api/v1/*)
+# Rows are kept in sync by triggers on all four tables, so reads never join.
+# Money/qty are stored in the /api/v1 shape (cents, qty_left/qty_total);
+# the legacy shape (price NUMERIC, stock) is derived at read time.
+# /public/offers keeps its original contract: only source='offers', `id` = offers.id.
+# /api/v1/* list both sources; there `id` is the feed id '<source>-<offer_id>'
+# (unique across sources, safe in Telegram start payloads), with `source`
+# and `offer_id` (id in the source table) alongside.
+
+async def _ensure(conn: asyncpg.Connection):
+    async with conn.transaction():
+        await conn.execute(bootstrap_sql.MIGRATION_LOCK_SQL)
+        await _create(conn)
+
+async def _create(conn: asyncpg.Connection):
+    # --- offer_feed ---
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS offer_feed (
+            source               TEXT NOT NULL,
+            offer_id             INTEGER NOT NULL,
+            restaurant_id        TEXT,
+            location_id          INTEGER,
+            title                TEXT,
+            description          TEXT,
+            category             TEXT,
+            price_cents          BIGINT NOT NULL DEFAULT 0,
+            original_price_cents BIGINT,
+            qty_total            INTEGER,
+            qty_left             INTEGER,
+            image_url            TEXT,
+            expires_at           TIMESTAMPTZ,
+            status               TEXT,
+            created_at           TIMESTAMPTZ,
+            merchant_name        TEXT,
+            address              TEXT,
+            city                 TEXT,
+            lat                  DOUBLE PRECISION,
+            lng                  DOUBLE PRECISION,
+            PRIMARY KEY (source, offer_id)
+        );
+    """)
+    await conn.execute("""
+        CREATE INDEX IF NOT EXISTS offer_feed_active_idx
+            ON offer_feed(expires_at, source, offer_id) WHERE status = 'active';
+        CREATE INDEX IF NOT EXISTS offer_feed_restaurant_idx
+            ON offer_feed(restaurant_id) WHERE source = 'foody';
+        CREATE INDEX IF NOT EXISTS offer_feed_location_idx
+            ON offer_feed(location_id) WHERE source = 'offers';
+    """)
+
+    # --- offers -> offer_feed ---
+    await conn.execute(r"""
+        CREATE OR REPLACE FUNCTION offer_feed_sync_offers() RETURNS trigger AS $$
+        BEGIN
+          IF TG_OP = 'DELETE' THEN
+            DELETE FROM offer_feed WHERE source = 'offers' AND offer_id = OLD.id;
+            RETURN OLD;
+          END IF;
+          -- offers without a location are not listed (inner join with locations)
+          IF NEW.location_id IS NULL THEN
+            DELETE FROM offer_feed WHERE source = 'offers' AND offer_id = NEW.id;
+            RETURN NEW;
+          END IF;
+          -- serialize with offer_feed_sync_locations for this location, so a concurrent
+          -- rename either commits before we read it or sees our feed row afterwards
+          PERFORM pg_advisory_xact_lock(hashtext('offer_feed_location'), NEW.location_id);
+          INSERT INTO offer_feed (
+            source, offer_id, location_id, title, description, category,
+            price_cents, qty_total, qty_left, image_url, expires_at, status, created_at,
+            merchant_name, address, city
+          )
+          SELECT 'offers', NEW.id, NEW.location_id, NEW.title, NEW.description, NEW.category,
+                 ROUND(NEW.price * 100)::bigint, NEW.stock, NEW.stock, NEW.image_url,
+                 NEW.expires_at, NEW.status, NEW.created_at,
+                 l.name, l.address_line, l.city
+          FROM (SELECT 1) one
+          LEFT JOIN locations l ON l.id = NEW.location_id
+          ON CONFLICT (source, offer_id) DO UPDATE SET
+            location_id = EXCLUDED.location_id, title = EXCLUDED.title,
+            description = EXCLUDED.description, category = EXCLUDED.category,
+            price_cents = EXCLUDED.price_cents, qty_total = EXCLUDED.qty_total,
+            qty_left = EXCLUDED.qty_left, image_url = EXCLUDED.image_url,
+            expires_at = EXCLUDED.expires_at, status = EXCLUDED.status,
+            created_at = EXCLUDED.created_at, merchant_name = EXCLUDED.merchant_name,
+            address = EXCLUDED.address, city = EXCLUDED.city;
+          RETURN NEW;
+        END $$ LANGUAGE plpgsql;
+    """)
+    await bootstrap_sql._create_trigger(conn, "offer_feed_offers_trg", "offers", """
+        CREATE TRIGGER offer_feed_offers_trg
+        AFTER INSERT OR UPDATE OR DELETE ON offers
+        FOR EACH ROW EXECUTE FUNCTION offer_feed_sync_offers();
+    """)
+
+    # --- locations -> offer_feed (merchant fields) ---
+    await conn.execute(r"""
+        CREATE OR REPLACE FUNCTION offer_feed_sync_locations() RETURNS trigger AS $$
+        BEGIN
+          PERFORM pg_advisory_xact_lock(hashtext('offer_feed_location'), NEW.id);
+          UPDATE offer_feed
+             SET merchant_name = NEW.name, address = NEW.address_line, city = NEW.city
+           WHERE source = 'offers' AND location_id = NEW.id;
+          RETURN NEW;
+        END $$ LANGUAGE plpgsql;
+    """)
+    await bootstrap_sql._create_trigger(conn, "offer_feed_locations_trg", "locations", """
+        CREATE TRIGGER offer_feed_locations_trg
+        AFTER UPDATE OF name, address_line, city ON locations
+        FOR EACH ROW EXECUTE FUNCTION offer_feed_sync_locations();
+    """)
+
+    # --- foody_offers -> offer_feed ---
+    await conn.execute(r"""
+        CREATE OR REPLACE FUNCTION offer_feed_sync_foody_offers() RETURNS trigger AS $$
+        BEGIN
+          IF TG_OP = 'DELETE' THEN
+            DELETE FROM offer_feed WHERE source = 'foody' AND offer_id = OLD.id;
+            RETURN OLD;
+          END IF;
+          -- no FK to foody_restaurants (nothing to lock while the restaurant row is
+          -- uncommitted): serialize with offer_feed_sync_foody_restaurants on the key
+          PERFORM pg_advisory_xact_lock(hashtext('offer_feed_restaurant'), hashtext(COALESCE(NEW.restaurant_id, '')));
+          INSERT INTO offer_feed (
+            source, offer_id, restaurant_id, title, description,
+            price_cents, original_price_cents, qty_total, qty_left,
+            image_url, expires_at, status, created_at,
+            merchant_name, address, lat, lng
+          )
+          SELECT 'foody', NEW.id, NEW.restaurant_id, NEW.title, NEW.description,
+                 NEW.price_cents, NEW.original_price_cents, NEW.qty_total, NEW.qty_left,
+                 NEW.image_url, NEW.expires_at, NEW.status, NEW.created_at,
+                 r.name, r.address, r.lat, r.lng
+          FROM (SELECT 1) one
+          LEFT JOIN foody_restaurants r ON r.restaurant_id = NEW.restaurant_id
+          ON CONFLICT (source, offer_id) DO UPDATE SET
+            restaurant_id = EXCLUDED.restaurant_id, title = EXCLUDED.title,
+            description = EXCLUDED.description, price_cents = EXCLUDED.price_cents,
+            original_price_cents = EXCLUDED.original_price_cents,
+            qty_total = EXCLUDED.qty_total, qty_left = EXCLUDED.qty_left,
+            image_url = EXCLUDED.image_url, expires_at = EXCLUDED.expires_at,
+            status = EXCLUDED.status, created_at = EXCLUDED.created_at,
+            merchant_name = EXCLUDED.merchant_name, address = EXCLUDED.address,
+            lat = EXCLUDED.lat, lng = EXCLUDED.lng;
+          RETURN NEW;
+        END $$ LANGUAGE plpgsql;
+    """)
+    await bootstrap_sql._create_trigger(conn, "offer_feed_foody_offers_trg", "foody_offers", """
+        CREATE TRIGGER offer_feed_foody_offers_trg
+        AFTER INSERT OR UPDATE OR DELETE ON foody_offers
+        FOR EACH ROW EXECUTE FUNCTION offer_feed_sync_foody_offers();
+    """)
+
+    # --- foody_restaurants -> offer_feed (merchant fields) ---
+    # no FK between foody_offers and foody_restaurants, so offers may outlive
+    # (or predate) their restaurant row: clear on OLD, fill from NEW
+    await conn.execute(r"""
+        CREATE OR REPLACE FUNCTION offer_feed_sync_foody_restaurants() RETURNS trigger AS $$
+        BEGIN
+          IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM pg_advisory_xact_lock(hashtext('offer_feed_restaurant'), hashtext(COALESCE(OLD.restaurant_id, '')));
+          END IF;
+          IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM pg_advisory_xact_lock(hashtext('offer_feed_restaurant'), hashtext(COALESCE(NEW.restaurant_id, '')));
+          END IF;
+          IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE offer_feed
+               SET merchant_name = NULL, address = NULL, lat = NULL, lng = NULL
+             WHERE source = 'foody' AND restaurant_id = OLD.restaurant_id;
+          END IF;
+          IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            UPDATE offer_feed
+               SET merchant_name = NEW.name, address = NEW.address, lat = NEW.lat, lng = NEW.lng
+             WHERE source = 'foody' AND restaurant_id = NEW.restaurant_id;
+            RETURN NEW;
+          END IF;
+          RETURN OLD;
+        END $$ LANGUAGE plpgsql;
+    """)
+    await bootstrap_sql._create_trigger(conn, "offer_feed_foody_restaurants_trg", "foody_restaurants", """
+        CREATE TRIGGER offer_feed_foody_restaurants_trg
+        AFTER INSERT OR UPDATE OR DELETE ON foody_restaurants
+        FOR EACH ROW EXECUTE FUNCTION offer_feed_sync_foody_restaurants();
+    """)
+
+    # backfill (idempotent): touch source rows missing from the feed so the triggers upsert them
+    await conn.execute("""
+        UPDATE offers o SET id = o.id
+        WHERE o.location_id IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM offer_feed f WHERE f.source = 'offers' AND f.offer_id = o.id);
+    """)
+    await conn.execute("""
+        UPDATE foody_offers o SET id = o.id
+        WHERE NOT EXISTS (SELECT 1 FROM offer_feed f WHERE f.source = 'foody' AND f.offer_id = o.id);
+    """)
+    # drop rows whose source disappeared while triggers were not installed
+    await conn.execute("""
+        DELETE FROM offer_feed f
+        WHERE (f.source = 'offers' AND NOT EXISTS (
+                  SELECT 1 FROM offers o WHERE o.id = f.offer_id AND o.location_id IS NOT NULL))
+           OR (f.source = 'foody' AND NOT EXISTS (SELECT 1 FROM foody_offers o WHERE o.id = f.offer_id));
+    """)
+
+
+# ====== Read queries (no joins) ======
+# list queries take the page size as $1 (routes pass FEED_LIMIT; the pool warm-up
+# runs the same text with 0 so asyncpg caches the statement without reading rows)
+FEED_LIMIT = 200
+
+_VISIBLE = """
+      status = 'active'
+      AND (expires_at IS NULL OR expires_at > NOW())
+      AND qty_left > 0
+"""
+
+PUBLIC_OFFERS_SQL = """
+    SELECT offer_id AS id, title, description,
+           (price_cents::numeric / 100)::numeric(12,2) AS price,
+           qty_left AS stock, category, image_url, expires_at, status,
+           location_id, merchant_name, address, city
+    FROM offer_feed
+    WHERE source = 'offers' AND""" + _VISIBLE + """
+    ORDER BY expires_at ASC, offer_id ASC
+    LIMIT $1
+"""
+
+V1_OFFERS_SQL = """
+    SELECT source || '-' || offer_id AS id, source, offer_id,
+           restaurant_id, location_id, title, description,
+           price_cents, original_price_cents, qty_total, qty_left,
+           image_url, expires_at, status, created_at,
+           merchant_name, address, city, lat, lng
+    FROM offer_feed
+    WHERE""" + _VISIBLE + """
+    ORDER BY expires_at ASC NULLS LAST, source, offer_id
+    LIMIT $1
+"""
+
+V1_MERCHANT_OFFERS_SQL = """
+    SELECT source || '-' || offer_id AS id, source, offer_id,
+           restaurant_id, location_id, title, description,
+           price_cents, original_price_cents, qty_total, qty_left,
+           image_url, expires_at, status, created_at,
+           merchant_name, address, city, lat, lng
+    FROM offer_feed
+    WHERE source = 'foody' AND restaurant_id = $1
+    ORDER BY offer_id DESC
+"""
+
+# ====== Reference join queries (parity check only) ======
+# PUBLIC_OFFERS_JOIN_SQL is the pre-feed /public/offers query (plus an id tie-break);
+# the v1 references are the UNION of both joins mapped to the v1 shape
+_JOIN_UNION = """
+    SELECT 'offers' AS source, o.id, NULL::text AS restaurant_id, o.location_id,
+           o.title, o.description, o.category,
+           ROUND(o.price * 100)::bigint AS price_cents, NULL::bigint AS original_price_cents,
+           o.stock AS qty_total, o.stock AS qty_left,
+           o.image_url, o.expires_at, o.status, o.created_at,
+           l.name AS merchant_name, l.address_line AS address, l.city,
+           NULL::double precision AS lat, NULL::double precision AS lng
+    FROM offers o
+    JOIN locations l ON l.id = o.location_id
+    UNION ALL
+    SELECT 'foody', o.id, o.restaurant_id, NULL::int,
+           o.title, o.description, NULL::text,
+           o.price_cents, o.original_price_cents,
+           o.qty_total, o.qty_left,
+           o.image_url, o.expires_at, o.status, o.created_at,
+           r.name, r.address, NULL::text, r.lat, r.lng
+    FROM foody_offers o
+    LEFT JOIN foody_restaurants r ON r.restaurant_id = o.restaurant_id
+"""
+
+PUBLIC_OFFERS_JOIN_SQL = """
+    SELECT o.id, o.title, o.description, o.price, o.stock, o.category,
+           o.image_url, o.expires_at, o.status,
+           l.id AS location_id, l.name AS merchant_name, l.address_line AS address, l.city
+    FROM offers o
+    JOIN locations l ON l.id = o.location_id
+    WHERE o.status = 'active'
+      AND o.expires_at > NOW()
+      AND o.stock > 0
+    ORDER BY o.expires_at ASC, o.id ASC
+    LIMIT $1
+"""
+
+V1_OFFERS_JOIN_SQL = """
+    SELECT u.source || '-' || u.id AS id, u.source, u.id AS offer_id,
+           u.restaurant_id, u.location_id, u.title, u.description,
+           u.price_cents, u.original_price_cents, u.qty_total, u.qty_left,
+           u.image_url, u.expires_at, u.status, u.created_at,
+           u.merchant_name, u.address, u.city, u.lat, u.lng
+    FROM (""" + _JOIN_UNION + """) u
+    WHERE""" + _VISIBLE + """
+    ORDER BY u.expires_at ASC NULLS LAST, u.source, u.id
+    LIMIT $1
+"""
+
+V1_MERCHANT_OFFERS_JOIN_SQL = """
+    SELECT u.source || '-' || u.id AS id, u.source, u.id AS offer_id,
+           u.restaurant_id, u.location_id, u.title, u.description,
+           u.price_cents, u.original_price_cents, u.qty_total, u.qty_left,
+           u.image_url, u.expires_at, u.status, u.created_at,
+           u.merchant_name, u.address, u.city, u.lat, u.lng
+    FROM (""" + _JOIN_UNION + """) u
+    WHERE u.source = 'foody' AND u.restaurant_id = $1
+    ORDER BY u.id DESC
+"""
@@ -0,0 +1,181 @@
+"""
+Parity check: offer_feed reads vs. the join-based queries they replace.
+
+  - /public/offers        vs the pre-feed `offers JOIN locations` query (legacy contract)
+  - /api/v1/offers rows with source='offers' vs that same baseline join, column by column
+    (price -> price_cents, stock -> qty_left/qty_total, merchant fields)
+  - /api/v1/offers, /api/v1/merchant/offers vs the UNION of both joins
+
+    DATABASE_URL=... python offer_feed_parity.py           # compare live data
+    DATABASE_URL=... python offer_feed_parity.py --seed    # + fixtures/mutations, rolled back
+
+Exits non-zero on the first mismatch. Expects migrations (RUN_MIGRATIONS=1) to have run.
+"""
+import os, sys, asyncio
+from datetime import datetime, timezone, timedelta
+
+import asyncpg
+
+import offer_feed
+
+DB_URL = os.getenv("DATABASE_URL")
+
+PAIRS = [
+    ("public/offers vs baseline", offer_feed.PUBLIC_OFFERS_SQL, offer_feed.PUBLIC_OFFERS_JOIN_SQL),
+    ("api/v1/offers", offer_feed.V1_OFFERS_SQL, offer_feed.V1_OFFERS_JOIN_SQL),
+]
+MERCHANT_PAIR = ("api/v1/merchant/offers", offer_feed.V1_MERCHANT_OFFERS_SQL, offer_feed.V1_MERCHANT_OFFERS_JOIN_SQL)
+
+
+# the baseline join, unfiltered, for looking up individual offers rows by id
+BASELINE_BY_ID_SQL = """
+    SELECT o.id, o.title, o.description, o.price, o.stock, o.category,
+           o.image_url, o.expires_at, o.status,
+           l.id AS location_id, l.name AS merchant_name, l.address_line AS address, l.city
+    FROM offers o
+    JOIN locations l ON l.id = o.location_id
+    WHERE o.id = ANY($1::int[])
+"""
+
+
+class ParityError(AssertionError):
+    pass
+
+
+async def _compare_v1_with_baseline(conn: asyncpg.Connection, step: str):
+    rows = [r for r in await conn.fetch(offer_feed.V1_OFFERS_SQL, offer_feed.FEED_LIMIT) if r["source"] == "offers"]
+    base = {r["id"]: r for r in await conn.fetch(BASELINE_BY_ID_SQL, [r["offer_id"] for r in rows])}
+    for r in rows:
+        b = base.get(r["offer_id"])
+        if b is None:
+            raise ParityError(f"[{step}] api/v1/offers: {r['id']} has no offers ⋈ locations row")
+        want = {
+            "id": f"offers-{b['id']}", "title": b["title"], "description": b["description"],
+            "price_cents": int(b["price"] * 100), "original_price_cents": None,
+            "qty_total": b["stock"], "qty_left": b["stock"],
+            "image_url": b["image_url"], "expires_at": b["expires_at"], "status": b["status"],
+            "location_id": b["location_id"], "merchant_name": b["merchant_name"],
+            "address": b["address"], "city": b["city"],
+        }
+        got = {k: r[k] for k in want}
+        if got != want:
+            raise ParityError(f"[{step}] api/v1/offers {r['id']} vs baseline\n  feed: {got}\n  base: {want}")
+    print(f"ok [{step}] api/v1/offers source=offers vs baseline: {len(rows)} rows")
+
+
+async def _compare(conn: asyncpg.Connection, step: str):
+    checks = [(name, feed, join, (offer_feed.FEED_LIMIT,)) for name, feed, join in PAIRS]
+    rids = await conn.fetch("SELECT DISTINCT restaurant_id FROM foody_offers WHERE restaurant_id IS NOT NULL")
+    for r in rids:
+        name, feed, join = MERCHANT_PAIR
+        checks.append((f"{name}?restaurant_id={r['restaurant_id']}", feed, join, (r["restaurant_id"],)))
+
+    for name, feed_sql, join_sql, args in checks:
+        got = [dict(r) for r in await conn.fetch(feed_sql, *args)]
+        want = [dict(r) for r in await conn.fetch(join_sql, *args)]
+        if got != want:
+            for i, (g, w) in enumerate(zip(got, want)):
+                if g != w:
+                    raise ParityError(f"[{step}] {name}: row {i} differs\n  feed: {g}\n  join: {w}")
+            raise ParityError(f"[{step}] {name}: {len(got)} rows from feed, {len(want)} from join")
+        print(f"ok [{step}] {name}: {len(got)} rows")
+    await _compare_v1_with_baseline(conn, step)
+
+
+async def _seed_and_compare(conn: asyncpg.Connection):
+    soon = datetime.now(timezone.utc) + timedelta(hours=3)
+    later = soon + timedelta(hours=1)
+    past = datetime.now(timezone.utc) - timedelta(hours=1)
+
+    # offers ⋈ locations
+    org_id = await conn.fetchval("INSERT INTO organizations (name) VALUES ('parity org') RETURNING id")
+    loc_id = await conn.fetchval(
+        "INSERT INTO locations (org_id, name, city, address_line) VALUES ($1,'Parity Bakery','Moscow','Tverskaya 1') RETURNING id",
+        org_id,
+    )
+    o1 = await conn.fetchval(
+        """
+        INSERT INTO offers (location_id, title, price, stock, image_url, expires_at)
+        VALUES ($1,'eclairs',199.90,5,'x.png',$2) RETURNING id
+        """,
+        loc_id, soon,
+    )
+    await conn.execute(
+        """
+        INSERT INTO offers (location_id, title, price, stock, image_url, expires_at)
+        VALUES ($1,'expired',10,1,'x.png',$2), ($1,'sold out',10,0,'x.png',$3), (NULL,'no location',10,1,'x.png',$3)
+        """,
+        loc_id, past, later,
+    )
+
+    # foody_offers ⋈ foody_restaurants
+    await conn.execute(
+        """
+        INSERT INTO foody_restaurants (restaurant_id, api_key, name, address, lat, lng)
+        VALUES ('RID_PARITY','KEY_PARITY','Parity Cafe','Arbat 2',55.75,37.59)
+        """
+    )
+    f1 = await conn.fetchval(
+        """
+        INSERT INTO foody_offers (restaurant_id, title, price_cents, original_price_cents, qty_total, qty_left, expires_at)
+        VALUES ('RID_PARITY','set',19900,34900,5,5,$1) RETURNING id
+        """,
+        soon,
+    )
+    await conn.execute(
+        """
+        INSERT INTO foody_offers (restaurant_id, title, price_cents, qty_total, qty_left, expires_at)
+        VALUES ('RID_PARITY','no expiry',500,1,1,NULL), ('RID_ORPHAN','orphan',700,2,2,$1)
+        """,
+        later,
+    )
+    await _compare(conn, "seed")
+
+    await conn.execute("UPDATE locations SET name='Parity Bakery 2', city='SPb' WHERE id=$1", loc_id)
+    await conn.execute("UPDATE offers SET stock=stock-1, price=149.50 WHERE id=$1", o1)
+    await conn.execute("UPDATE foody_offers SET qty_left=0 WHERE id=$1", f1)
+    await _compare(conn, "update")
+
+    o2 = await conn.fetchval(
+        "INSERT INTO offers (location_id, title, price, stock, image_url, expires_at) VALUES ($1,'moved',5,2,'x.png',$2) RETURNING id",
+        loc_id, later,
+    )
+    await conn.execute("UPDATE offers SET location_id=NULL WHERE id=$1", o2)
+    await _compare(conn, "unlink location")
+
+    await conn.execute(
+        "INSERT INTO foody_restaurants (restaurant_id, api_key, name, lat, lng) VALUES ('RID_ORPHAN','K','Late Cafe',1,2)"
+    )
+    await conn.execute("UPDATE foody_restaurants SET restaurant_id='RID_PARITY_2' WHERE restaurant_id='RID_PARITY'")
+    await _compare(conn, "restaurant")
+
+    await conn.execute("DELETE FROM foody_restaurants WHERE restaurant_id='RID_ORPHAN'")
+    await conn.execute("DELETE FROM offers WHERE id=$1", o1)
+    await conn.execute("DELETE FROM locations WHERE id=$1", loc_id)
+    await _compare(conn, "delete")
+
+
+async def run(seed: bool):
+    conn = await asyncpg.connect(DB_URL)
+    try:
+        # one snapshot for both sides; --seed data never leaves the transaction
+        tr = conn.transaction(isolation="repeatable_read")
+        await tr.start()
+        try:
+            await _compare(conn, "live")
+            if seed:
+                await _seed_and_compare(conn)
+        finally:
+            await tr.rollback()
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    if not DB_URL:
+        sys.exit("DATABASE_URL missing")
+    try:
+        asyncio.run(run("--seed" in sys.argv[1:]))
+    except ParityError as e:
+        print("PARITY_MISMATCH:", e)
+        sys.exit(1)
@@ -0,0 +1,31 @@
+import os, signal, asyncio
+
+import asyncpg
+
+import jobs
+
+# Background job worker: `python worker.py` (same image/env as `uvicorn main:app`).
+#   JOB_QUEUES="default:4,images:2"  — queues to consume and their concurrency (global, all workers)
+
+DATABASE_URL = os.environ.get("DATABASE_URL")
+RUN_MIGRATIONS = os.environ.get("RUN_MIGRATIONS", "0") == "1"
+
+async def main():
+    if not DATABASE_URL:
+        raise RuntimeError("DATABASE_URL missing")
+    if RUN_MIGRATIONS:
+        conn = await asyncpg.connect(DATABASE_URL)
+        try:
+            await jobs._ensure(conn)
+        finally:
+            await conn.close()
+
+    worker = jobs.Worker(DATABASE_URL, jobs.parse_queues(jobs.JOB_QUEUES))
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    print("WORKER:", worker.name, worker.queues)
+    await worker.run()
+
+if __name__ == "__main__":
+    asyncio.run(main())
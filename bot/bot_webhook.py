@@ -1,10 +1,11 @@
 import os
+import re
+import asyncio
 from fastapi import FastAPI, Request, HTTPException
-from aiogram import Bot, Dispatcher
-from aiogram.enums.parse_mode import ParseMode
-from aiogram.client.default import DefaultBotProperties
-from aiogram.types import Update, InlineKeyboardMarkup, InlineKeyboardButton, WebAppInfo
-from aiogram.filters import CommandStart
+from fastapi.responses import JSONResponse
+
+# aiogram (pydantic-модели, aiohttp) импортируется в фоне после старта:
+# сервер сразу отвечает на liveness, readiness ждёт готовности bot/dp
 
 BOT_TOKEN = os.getenv("BOT_TOKEN","")
 WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET","foodySecret123")
@@ -21,25 +22,70 @@ def _https(u:str)->str:
 WEBAPP_BUYER_URL = _https(WEBAPP_BUYER_URL)
 WEBAPP_MERCHANT_URL = _https(WEBAPP_MERCHANT_URL)
 
-bot = Bot(BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-dp = Dispatcher()
+bot = None
+dp = None
+_ready: asyncio.Task | None = None
 app = FastAPI()
 
+def _import_aiogram():
+    import aiogram.client.default, aiogram.enums.parse_mode, aiogram.filters, aiogram.types  # noqa: F401
+
+def _build():
+    global bot, dp
+    from aiogram import Bot, Dispatcher
+    from aiogram.enums.parse_mode import ParseMode
+    from aiogram.client.default import DefaultBotProperties
+    from aiogram.filters import CommandStart
+
+    b = Bot(BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+    d = Dispatcher()
+    d.message(CommandStart())(on_start)
+    bot, dp = b, d
+
+async def _warm():
+    # импорт в потоке (не блокирует event loop), объекты создаём в loop
+    await asyncio.to_thread(_import_aiogram)
+    _build()
+
+@app.on_event("startup")
+async def warmup():
+    global _ready
+    if _ready is None:
+        _ready = asyncio.create_task(_warm())
+
+async def _wait_ready():
+    await warmup()
+    await _ready
+
 @app.get("/health")
+@app.get("/health/live")
 async def health(): return {"ok": True}
 
+@app.get("/health/ready")
+async def ready():
+    if _ready is None or not _ready.done():
+        return JSONResponse({"ok": False, "detail": "warming up"}, status_code=503)
+    # .exception() на отменённой задаче бросает CancelledError (ушло бы в 500)
+    if _ready.cancelled():
+        return JSONResponse({"ok": False, "detail": "warm-up cancelled"}, status_code=503)
+    if _ready.exception() is not None:
+        return JSONResponse({"ok": False, "detail": repr(_ready.exception())}, status_code=503)
+    return {"ok": True}
+
 def main_kb():
+    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, WebAppInfo
     return InlineKeyboardMarkup(inline_keyboard=[[
         InlineKeyboardButton(text="🛒 Витрина", web_app=WebAppInfo(url=WEBAPP_BUYER_URL)),
         InlineKeyboardButton(text="👨‍🍳 ЛК партнёра", web_app=WebAppInfo(url=WEBAPP_MERCHANT_URL))
     ]])
 
-@dp.message(CommandStart())
 async def on_start(m):
+    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, WebAppInfo
     payload = None
     if m.text and " " in m.text:
         payload = m.text.split(" ",1)[1].strip()
-    if payload and payload.startswith("offer_"):
+    # offer_<feed id>, напр. offer_foody-12 (id из /api/v1/offers)
+    if payload and payload.startswith("offer_") and re.fullmatch(r"[A-Za-z0-9_-]+", payload):
         offer_id = payload.split("offer_",1)[1]
         kb = InlineKeyboardMarkup(inline_keyboard=[[
             InlineKeyboardButton(text="Открыть предложение", web_app=WebAppInfo(url=f"{WEBAPP_BUYER_URL}?offer={offer_id}"))
@@ -51,6 +97,8 @@ async def on_start(m):
 async def tg_webhook(request: Request):
     if request.headers.get("x-telegram-bot-api-secret-token") != WEBHOOK_SECRET:
         raise HTTPException(401, "bad secret")
+    await _wait_ready()
+    from aiogram.types import Update
     data = await request.json()
     upd = Update.model_validate(data)
     await dp.feed_update(bot, upd)
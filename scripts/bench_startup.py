@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Cold-start import cost of the backend and bot apps, measured with -X importtime.
+
+    python scripts/bench_startup.py             # both apps, 5 runs each
+    python scripts/bench_startup.py --runs 10 --top 15
+
+For each app prints the median wall time of `python -X importtime -c "import <module>"`,
+the summed cumulative import time of top-level modules, the heaviest of them,
+and whether the lazily-loaded packages (boto3, aiogram) were pulled in at import.
+"""
+import os, sys, time, argparse, statistics, subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = [
+    # name, cwd, module, packages that must stay out of the import graph
+    ("backend", os.path.join(ROOT, "backend"), "main", ("boto3", "botocore")),
+    ("bot", os.path.join(ROOT, "bot"), "bot_webhook", ("aiogram",)),
+]
+
+def _parse(stderr: str):
+    """-> {top-level module: cumulative us}, set of all imported modules"""
+    top, seen = {}, set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _self_us, cum_us, name = line.split(":", 1)[1].split("|", 2)
+        mod = name.strip()
+        seen.add(mod)
+        # nesting is encoded as two extra spaces per level after the "| "
+        if not name[1:].startswith(" "):
+            top[mod] = int(cum_us)
+    return top, seen
+
+def _run_once(cwd: str, module: str):
+    env = dict(os.environ)
+    env.setdefault("BOT_TOKEN", "123456:TEST")
+    t0 = time.perf_counter()
+    res = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd, env=env, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - t0
+    if res.returncode != 0:
+        tail = res.stderr.strip().splitlines()[-1:] or ["?"]
+        raise RuntimeError(f"import {module} failed: {tail[0]}")
+    return wall, res.stderr
+
+def bench(name, cwd, module, lazy, runs, top_n):
+    _run_once(cwd, module)  # warm .pyc / page cache
+    walls, top, seen = [], {}, set()
+    for _ in range(runs):
+        wall, stderr = _run_once(cwd, module)
+        walls.append(wall)
+        top, seen = _parse(stderr)
+
+    print(f"== {name} ({module}) ==")
+    print(f"wall (median of {runs}): {statistics.median(walls) * 1000:.1f} ms")
+    print(f"top-level imports (last run): {sum(top.values()) / 1000:.1f} ms")
+    for mod, us in sorted(top.items(), key=lambda x: -x[1])[:top_n]:
+        print(f"  {us / 1000:8.1f} ms  {mod}")
+    for pkg in lazy:
+        print(f"  {pkg} imported at startup: {'YES' if pkg in seen else 'no'}")
+    print()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=10)
+    args = ap.parse_args()
+    failed = False
+    for name, cwd, module, lazy in TARGETS:
+        try:
+            bench(name, cwd, module, lazy, args.runs, args.top)
+        except RuntimeError as e:
+            print(f"== {name} ==\n{e}\n")
+            failed = True
+    sys.exit(1 if failed else 0)
@@ -34,7 +34,7 @@
     $('#sheet').classList.remove('hidden');
     $('#reserveBtn').onclick = async ()=>{
       try{
-        const resp = await fetch(API+'/api/v1/public/reserve',{ method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({ offer_id: o.id||o.offer_id, name:'TG', phone:'' }) });
+        const resp = await fetch(API+'/api/v1/public/reserve',{ method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({ offer_id: o.offer_id, source: o.source, name:'TG', phone:'' }) });
         if(!resp.ok) throw new Error('reserve');
         toast('Забронировано ✅');
       }catch(_){ toast('Не удалось забронировать'); }
@@ -47,6 +47,13 @@
   const toastBox = document.getElementById('toast');
   const toast = (m)=>{ const el=document.createElement('div'); el.className='toast'; el.textContent=m; toastBox.appendChild(el); setTimeout(()=>el.remove(),3200); };
 
-  async function load(){ offers = await fetch(API+'/api/v1/offers').then(r=>r.json()).catch(()=>[]); render(); }
+  // ?offer=<feed id> (ссылка из бота offer_<feed id>), напр. ?offer=foody-12
+  const deepLink = new URLSearchParams(location.search).get('offer');
+  async function load(){
+    offers = await fetch(API+'/api/v1/offers').then(r=>r.json()).catch(()=>[]);
+    render();
+    const o = deepLink && offers.find(x => String(x.id) === deepLink);
+    if (o) open(o);
+  }
   load();
 })();
\ No newline at end of file